@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from profiling import toggle
+
+ADMIN_HOST = os.getenv("ADMIN_HOST", "127.0.0.1")
+ADMIN_PORT = os.getenv("ADMIN_PORT")
+PAGE_SIZE = 50
+ADMIN_STARTED = "Админ-API запущен на {host}:{port}"
+ADMIN_REQUEST = "{address} {request}"
+NOT_FOUND = "Неизвестный адрес: {path}"
+BAD_PAGE = "offset и limit должны быть неотрицательными целыми числами"
+
+
+def make_snapshot(state, next_poll):
+    """Делает независимую копию состояния опроса для админ-API.
+
+    Копия публикуется заменой ссылки, поэтому обработчики читают её,
+    не блокируя основной цикл, а цикл не ждёт обработчиков.
+    """
+    snapshot = json.loads(json.dumps(state))
+    snapshot["next_poll"] = next_poll
+    snapshot["queue"] = [
+        dict(due=due, message=message)
+        for due, message in sorted(snapshot["queue"])
+    ]
+    snapshot["homeworks"] = [
+        dict(homework=name, message=message)
+        for name, message in snapshot.pop("sent_messages").items()
+    ]
+    return snapshot
+
+
+def paginate(items, query):
+    """Возвращает страницу items по параметрам offset и limit."""
+    try:
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", [str(PAGE_SIZE)])[0])
+    except ValueError:
+        raise ValueError(BAD_PAGE)
+    if offset < 0 or limit < 0:
+        raise ValueError(BAD_PAGE)
+    return dict(
+        total=len(items),
+        offset=offset,
+        limit=limit,
+        items=items[offset:offset + limit],
+    )
+
+
+class AdminHandler(BaseHTTPRequestHandler):
+    """Отдаёт снимки состояния бота и принимает команды."""
+
+    def do_GET(self):
+        """Отдаёт сводку, страницу работ или очередь отправки."""
+        url = urlsplit(self.path)
+        snapshot = self.server.snapshot
+        query = parse_qs(url.query)
+        if url.path == "/state":
+            return self.respond(
+                HTTPStatus.OK,
+                {
+                    key: value
+                    for key, value in snapshot.items()
+                    if key not in ("homeworks", "queue")
+                },
+            )
+        if url.path not in ("/homeworks", "/queue"):
+            return self.not_found(url.path)
+        try:
+            page = paginate(snapshot.get(url.path[1:], []), query)
+        except ValueError as error:
+            return self.respond(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+        self.respond(HTTPStatus.OK, page)
+
+    def do_POST(self):
+        """Запускает внеочередной опрос или переключает профилирование."""
+        path = urlsplit(self.path).path
+        if path == "/poll":
+            self.server.wakeup.set()
+            return self.respond(HTTPStatus.ACCEPTED, {})
+        if path == "/profile":
+            return self.respond(HTTPStatus.OK, {"profile": toggle()})
+        self.not_found(path)
+
+    def not_found(self, path):
+        """Отвечает на неизвестный адрес."""
+        self.respond(
+            HTTPStatus.NOT_FOUND, {"error": NOT_FOUND.format(path=path)}
+        )
+
+    def respond(self, status, data):
+        """Отправляет клиенту JSON-ответ."""
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Пишет строку доступа в общий лог вместо stderr."""
+        logging.info(
+            ADMIN_REQUEST.format(
+                address=self.address_string(), request=format % args
+            )
+        )
+
+
+def make_server(wakeup, host=ADMIN_HOST, port=ADMIN_PORT):
+    """Создаёт HTTP-сервер админ-API."""
+    server = ThreadingHTTPServer((host, int(port)), AdminHandler)
+    server.daemon_threads = True
+    server.snapshot = {}
+    server.wakeup = wakeup
+    return server
+
+
+def start(wakeup):
+    """Запускает админ-API в фоне, если задан ADMIN_PORT."""
+    if not ADMIN_PORT:
+        return None
+    server = make_server(wakeup)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(
+        ADMIN_STARTED.format(host=ADMIN_HOST, port=server.server_port)
+    )
+    return server
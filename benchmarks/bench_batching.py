@@ -0,0 +1,87 @@
+"""Сравнение опроса по работе на запрос и разбора пакетного ответа.
+
+API Практикума отдаёт статусы всех обновившихся работ токена одним
+ответом, и poll раскладывает его по работам. Бенчмарк поднимает
+локальный подставной API с задержкой RTT и сравнивает, сколько работ
+в секунду проходит через get_api_answer -> check_response ->
+select_changed, если каждая работа стоит отдельного запроса и если
+все они приходят в одном ответе.
+
+Запуск: python benchmarks/bench_batching.py [работы] [RTT, мс]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+
+DEFAULTS = ["200", "20"]
+STATUSES = list(homework.HOMEWORK_VERDICTES)
+RESULT = "{name:>8}: {requests} запросов, {rate:>7.0f} работ/с"
+
+
+class StandInAPI(BaseHTTPRequestHandler):
+    """Подставной API: отдаёт server.batch работ после задержки RTT."""
+
+    def do_GET(self):
+        """Отвечает списком работ в формате API Практикума."""
+        time.sleep(self.server.rtt)
+        body = json.dumps({
+            "homeworks": [
+                dict(
+                    homework_name=f"hw{index}",
+                    status=STATUSES[index % len(STATUSES)],
+                )
+                for index in range(self.server.batch)
+            ],
+            "current_date": int(time.time()),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Не пишет строки доступа."""
+
+
+def run(server, homeworks, batch):
+    """Прогоняет homeworks работ пачками по batch, возвращает работ/с."""
+    server.batch = batch
+    sent_messages = {}
+    requests = 0
+    started = time.perf_counter()
+    while requests * batch < homeworks:
+        response = homework.get_api_answer(0)
+        homework.select_changed(
+            homework.check_response(response), sent_messages
+        )
+        sent_messages.clear()
+        requests += 1
+    return requests, requests * batch / (time.perf_counter() - started)
+
+
+def main():
+    """Печатает пропускную способность для обоих способов опроса."""
+    args = sys.argv[1:] + DEFAULTS[len(sys.argv[1:]):]
+    homeworks, rtt = map(int, args[:2])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInAPI)
+    server.rtt = rtt / 1000
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    homework.ENDPOINT = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        for name, batch in (("single", 1), ("batch", homeworks)):
+            requests, rate = run(server, homeworks, batch)
+            print(RESULT.format(name=name, requests=requests, rate=rate))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
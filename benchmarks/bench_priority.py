@@ -0,0 +1,98 @@
+"""Сравнение задержки срочных сообщений в очереди FIFO и с приоритетами.
+
+Очередь отправки перегружена: сообщения поступают быстрее, чем Telegram
+их принимает. Время виртуальное, по одной отправке в секунду.
+"""
+import random
+import sys
+import time
+from collections import deque
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from clock import VirtualClock  # noqa: E402
+
+SECONDS = 3600
+OVERLOAD_SECONDS = 300
+OVERLOAD_RATE = 3
+NORMAL_RATE = 0.5
+PRIORITIES = [
+    (homework.PRIORITY_VERDICT, 0.2),
+    (homework.PRIORITY_REVIEWING, 0.5),
+    (homework.PRIORITY_ERROR, 0.3),
+]
+RESULT = "{name:>8}: p50 {p50:>6.0f} с, p99 {p99:>6.0f} с"
+
+
+def arrivals(seed=1):
+    """Генерирует поток (время, приоритет) поступающих сообщений."""
+    rng = random.Random(seed)
+    priorities, weights = zip(*PRIORITIES)
+    for second in range(SECONDS):
+        rate = OVERLOAD_RATE if second < OVERLOAD_SECONDS else NORMAL_RATE
+        count = int(rate) + (rng.random() < rate % 1)
+        for _ in range(count):
+            yield second, rng.choices(priorities, weights)[0]
+
+
+def run_fifo():
+    """Возвращает задержки срочных сообщений при отправке по порядку."""
+    queue = deque()
+    latencies = []
+    stream = arrivals()
+    pending = next(stream, None)
+    for second in range(SECONDS * 2):
+        while pending and pending[0] == second:
+            queue.append(pending)
+            pending = next(stream, None)
+        if queue:
+            sent, priority = queue.popleft()
+            if priority == homework.PRIORITY_VERDICT:
+                latencies.append(second - sent)
+    return latencies
+
+
+def run_heap():
+    """Возвращает задержки срочных сообщений при очереди homework."""
+    state = {"queue": []}
+    latencies = []
+    stream = arrivals()
+    pending = next(stream, None)
+    homework.CLOCK = VirtualClock()
+    for second in range(SECONDS * 2):
+        homework.CLOCK.run_until(second)
+        while pending and pending[0] == second:
+            homework.enqueue(state, pending[1], pending)
+            pending = next(stream, None)
+        if state["queue"]:
+            sent, priority = homework.heapq.heappop(state["queue"])[1]
+            if priority == homework.PRIORITY_VERDICT:
+                latencies.append(second - sent)
+    return latencies
+
+
+def percentile(values, share):
+    """Возвращает перцентиль share из списка значений."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    """Печатает p50 и p99 задержки смены вердикта для обеих очередей."""
+    for name, run in (("fifo", run_fifo), ("priority", run_heap)):
+        started = time.perf_counter()
+        latencies = run()
+        print(
+            RESULT.format(
+                name=name,
+                p50=percentile(latencies, 0.5),
+                p99=percentile(latencies, 0.99),
+            ),
+            f"({time.perf_counter() - started:.2f} с)",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Симуляция опроса многих пользователей в виртуальном времени.
+
+Весь конвейер poll -> check_response -> parse_status -> очередь
+отправки выполняется на VirtualClock против подставных API и бота,
+поэтому недели опроса занимают секунды или минуты.
+
+Запуск: python benchmarks/bench_simulation.py [пользователи] [дни] [RETRY_TIME]
+"""
+import logging
+import random
+import sys
+import time
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from clock import VirtualClock  # noqa: E402
+
+DAY = 24 * 3600
+REVIEW_TIME = (3600, 2 * DAY)
+VERDICTS = ["approved", "rejected"]
+DEFAULTS = ["1000", "7", "300"]
+RESULT = (
+    "{tenants} польз. x {days} дн., RETRY_TIME={retry_time}: "
+    "{polls} опросов, {sends} сообщений, задержка уведомления "
+    "в среднем {latency:.0f} с, за {elapsed:.2f} с ({rate:.0f} опросов/с)"
+)
+
+
+class Tenant:
+    """Пользователь с одной работой, проходящей ревью."""
+
+    def __init__(self, index, rng):
+        """Расписывает смену статусов работы пользователя."""
+        submitted = rng.uniform(0, DAY)
+        reviewing = submitted + rng.uniform(*REVIEW_TIME)
+        self.name = f"hw{index}"
+        self.changes = [
+            (submitted, "reviewing"),
+            (reviewing, rng.choice(VERDICTS)),
+        ]
+        self.state = homework.initial_state()
+        self.changed_at = None
+
+
+class StandInAPI:
+    """Подставной API: отдаёт работы, обновлённые после from_date."""
+
+    def __init__(self, clock):
+        """Привязывает API к виртуальным часам."""
+        self.clock = clock
+        self.tenant = None
+        self.polls = 0
+
+    def get_api_answer(self, current_timestamp):
+        """Возвращает ответ в формате API Практикума."""
+        self.polls += 1
+        now = self.clock.time()
+        homeworks = []
+        for changed_at, status in self.tenant.changes:
+            if current_timestamp <= changed_at <= now:
+                homeworks = [
+                    dict(homework_name=self.tenant.name, status=status)
+                ]
+                self.tenant.changed_at = changed_at
+        return dict(homeworks=homeworks, current_date=now)
+
+
+class StandInBot:
+    """Подставной бот: считает отправки и задержку уведомлений."""
+
+    def __init__(self, api):
+        """Связывает бота с API, чтобы знать текущего пользователя."""
+        self.api = api
+        self.sends = 0
+        self.delay = 0
+
+    def send_message(self, chat_id, text):
+        """Учитывает отправку сообщения."""
+        self.sends += 1
+        self.delay += self.api.clock.time() - self.api.tenant.changed_at
+
+
+def simulate(tenants, days, retry_time, seed=1):
+    """Прогоняет опрос tenants пользователей за days дней."""
+    rng = random.Random(seed)
+    clock = VirtualClock()
+    api = StandInAPI(clock)
+    bot = StandInBot(api)
+    homework.CLOCK = clock
+    homework.get_api_answer = api.get_api_answer
+
+    def tick(tenant):
+        api.tenant = tenant
+        homework.poll(bot, tenant.state)
+        clock.call_later(retry_time, tick, tenant)
+
+    for index in range(tenants):
+        clock.call_at(rng.uniform(0, retry_time), tick, Tenant(index, rng))
+    clock.run_until(days * DAY)
+    return api.polls, bot.sends, bot.delay / max(bot.sends, 1)
+
+
+def main():
+    """Печатает итоги симуляции и скорость прогона."""
+    logging.disable(logging.INFO)
+    args = sys.argv[1:] + DEFAULTS[len(sys.argv[1:]):]
+    tenants, days, retry_time = map(int, args[:3])
+    started = time.perf_counter()
+    polls, sends, latency = simulate(tenants, days, retry_time)
+    elapsed = time.perf_counter() - started
+    print(
+        RESULT.format(
+            tenants=tenants,
+            days=days,
+            retry_time=retry_time,
+            polls=polls,
+            sends=sends,
+            latency=latency,
+            elapsed=elapsed,
+            rate=polls / elapsed,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import heapq
+import itertools
+import time
+
+
+class Clock:
+    """Реальное время: системные часы и настоящие ожидания."""
+
+    def time(self):
+        """Возвращает текущее время в секундах от эпохи."""
+        return time.time()
+
+    def monotonic(self):
+        """Возвращает показание монотонных часов."""
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """Приостанавливает выполнение на seconds секунд."""
+        time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """Ждёт установки event не дольше timeout секунд."""
+        return event.wait(timeout)
+
+
+class VirtualClock:
+    """Виртуальное время для симуляций и тестов.
+
+    Ожидания не блокируют, а сдвигают время вперёд, выполняя по пути
+    отложенные вызовы из очереди таймеров в порядке их срока. Так опрос
+    за недели укладывается во время, которое нужно процессору.
+    """
+
+    def __init__(self, now=0):
+        """Запускает часы с момента now."""
+        self.now = now
+        self.timers = []
+        self.counter = itertools.count()
+
+    def time(self):
+        """Возвращает текущее виртуальное время."""
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds):
+        """Сдвигает время на seconds секунд, выполняя таймеры."""
+        self.run_until(self.now + seconds)
+
+    def wait(self, event, timeout):
+        """Сдвигает время на timeout или до таймера, установившего event."""
+        self.run_until(self.now + timeout, event)
+        return event.is_set()
+
+    def call_at(self, when, callback, *args):
+        """Планирует вызов callback(*args) на момент when."""
+        heapq.heappush(self.timers, (when, next(self.counter), callback, args))
+
+    def call_later(self, delay, callback, *args):
+        """Планирует вызов callback(*args) через delay секунд."""
+        self.call_at(self.now + delay, callback, *args)
+
+    def run_until(self, end, event=None):
+        """Выполняет все таймеры со сроком до end и переводит часы на end.
+
+        Если передан event, время останавливается сразу после таймера,
+        который его установил.
+        """
+        while self.timers and self.timers[0][0] <= end:
+            if event is not None and event.is_set():
+                return
+            when, _, callback, args = heapq.heappop(self.timers)
+            self.now = max(self.now, when)
+            callback(*args)
+        if event is None or not event.is_set():
+            self.now = max(self.now, end)
@@ -1,10 +1,52 @@
-class StatusCodeError(Exception):
+SECRET_HEADERS = ["authorization"]
+REDACTED = "***"
+
+
+def redact(context):
+    """Возвращает данные запроса со скрытыми секретными заголовками."""
+    headers = context.get("headers")
+    if not headers:
+        return context
+    return dict(
+        context,
+        headers={
+            key: REDACTED if key.lower() in SECRET_HEADERS else value
+            for key, value in headers.items()
+        },
+    )
+
+
+class RequestError(Exception):
+    """Ошибка запроса к API.
+
+    Хранит шаблон и данные запроса как есть, а строку собирает только
+    при выводе в лог или в сообщение, скрывая секретные заголовки.
+    """
+
+    def __init__(self, template, **context):
+        """Сохраняет шаблон сообщения и данные запроса."""
+        super().__init__(template)
+        self.template = template
+        self.context = context
+
+    def __str__(self):
+        """Форматирует сообщение без секретов."""
+        return self.template.format(**redact(self.context))
+
+
+class NetworkError(RequestError, ConnectionError):
+    """Сбой сети при запросе к API."""
+
+    pass
+
+
+class StatusCodeError(RequestError):
     """Не верный код возврата."""
 
     pass
 
 
-class ServiceDenaied(Exception):
+class ServiceDenaied(RequestError):
     """Отказ в обслуживании."""
 
     pass
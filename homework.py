@@ -1,13 +1,25 @@
+import heapq
+import json
 import logging
 import os
-import time
+import signal
+import threading
 from logging.handlers import RotatingFileHandler
 
 import requests
 from dotenv import load_dotenv
 from telegram import Bot
+from telegram.error import BadRequest
 
-from exceptions import ServiceDenaied, StatusCodeError
+import admin
+from clock import Clock
+from exceptions import NetworkError, ServiceDenaied, StatusCodeError
+from profiling import request_toggle, stage, start_worker, timed
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 load_dotenv()
 
@@ -16,7 +28,19 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 TOKENS = ["TELEGRAM_TOKEN", "PRACTICUM_TOKEN", "TELEGRAM_CHAT_ID"]
 RETRY_TIME = 300
-ENDPOINT = "https://practicum.yandex.ru/api/user_api/homework_statuses/"
+MESSAGE_LIMIT = 4096
+REQUEST_TIMEOUT = 30
+DRAIN_TIME = 15
+DIGEST_TIME = int(os.getenv("DIGEST_TIME", 0))
+PRIORITY_AGING = 2 * RETRY_TIME
+PRIORITY_VERDICT = 0
+PRIORITY_REVIEWING = 1
+PRIORITY_ERROR = 2
+STATE_FILE = os.getenv("STATE_FILE", __file__ + ".state")
+ENDPOINT = os.getenv(
+    "PRACTICUM_ENDPOINT",
+    "https://practicum.yandex.ru/api/user_api/homework_statuses/",
+)
 HEADERS = {"Authorization": f"OAuth {PRACTICUM_TOKEN}"}
 HOMEWORK_VERDICTES = {
     "approved": "Работа проверена: ревьюеру всё понравилось. Ура!",
@@ -41,49 +65,84 @@ NO_HOMEWORK_STATUS = "Неизвестный статус: {status}"
 NO_SUCH_TOKEN = "Отсутствует обязательный токен {token}"
 NO_ANY_TOKEN = "Отсутствует один из обязательных токенов"
 STATUS_CHANGE = 'Изменился статус проверки работы "{homework}". {status}'
+DIGEST_HEADER = "Изменились статусы проверки работ: {count}"
+DIGEST_HOMEWORK = "- {homework}"
+DIGEST_MORE = "... и ещё работ: {count}"
 RESPONSE_JSON_ERRORS = ["code", "error"]
 SEND_MESSAGE = "Отправлено сообщение: {message}"
 MESSAGE_FAILED = "Не удалось отправить сообщение. chat_id: {chat_id}"
+MESSAGE_DROPPED = (
+    "Telegram отклонил сообщение, оно удалено из очереди. "
+    "chat_id: {chat_id}, сообщение: {message}"
+)
 ERROR_MESSAGE = "Ошибка! {error}"
+STATE_LOAD_ERROR = "Не удалось прочитать состояние из {path}"
+STATE_LOCKED = "Ожидаем завершения предыдущего процесса: {path} занят"
+STATE_RESUMED = "Состояние восстановлено, from_date: {current_date}"
+SHUTDOWN_REQUESTED = "Получен сигнал {signal}, завершаем работу"
+SHUTDOWN_DONE = "Бот остановлен, from_date: {current_date}"
+STOPPING = threading.Event()
+WAKEUP = threading.Event()
+CLOCK = Clock()
+DRAIN_DEADLINE = None
+STOP_SIGNAL = None
 
 
+@timed
 def send_message(bot, message):
-    """Отправляет сообщение в Telegram чат определяемый TELEGRAM_CHAT_ID."""
+    """Отправляет сообщение в Telegram чат определяемый TELEGRAM_CHAT_ID.
+
+    Возвращает False, если сообщение стоит отправить позже. Сообщение,
+    которое Telegram отклонил как некорректное (BadRequest: слишком
+    длинное, чат не найден), повторно не отправляется: ошибка
+    логируется, и оно считается обработанным, чтобы не блокировать
+    очередь.
+    """
     try:
         bot.send_message(TELEGRAM_CHAT_ID, message)
         logging.info(SEND_MESSAGE.format(message=message))
+        return True
+    except BadRequest:
+        logging.error(
+            MESSAGE_DROPPED.format(chat_id=TELEGRAM_CHAT_ID, message=message),
+            exc_info=True,
+        )
+        return True
     except Exception:
         logging.error(
             MESSAGE_FAILED.format(chat_id=TELEGRAM_CHAT_ID),
             exc_info=True,
         )
+        return False
 
 
+@timed
 def get_api_answer(current_timestamp):
     """Делает запрос к эндпоинту API-сервиса."""
     params = {"from_date": current_timestamp}
     request_data = dict(url=ENDPOINT, headers=HEADERS, params=params)
     try:
-        response = requests.get(**request_data)
+        response = requests.get(**request_data, timeout=REQUEST_TIMEOUT)
     except requests.exceptions.RequestException as error:
-        raise ConnectionError(
-            NETWORK_ERROR.format(exception=error, **request_data)
-        )
+        raise NetworkError(NETWORK_ERROR, error=error, **request_data)
     if not response.status_code == 200:
         raise StatusCodeError(
-            STATUS_CODE_ERROR.format(code=response.status_code, **request_data)
+            STATUS_CODE_ERROR, code=response.status_code, **request_data
         )
-    response = response.json()
+    with stage("response.json"):
+        response = response.json()
     for key in RESPONSE_JSON_ERRORS:
         if key in response:
             raise ServiceDenaied(
-                SERVISE_DENAIED_ERROR.format(
-                    key=key, error=response[key], **request_data
-                )
+                SERVISE_DENAIED_ERROR,
+                key=key,
+                error=response[key],
+                **request_data,
             )
     return response
 
 
+@timed
 def check_response(response):
     """Проверяет ответ API на корректность."""
     if not isinstance(response, dict):
@@ -96,6 +155,7 @@ def check_response(response):
     return homeworks
 
 
+@timed
 def parse_status(homework):
     """Извлекает из информации о конкретной домашней работе ее статус."""
     status = homework["status"]
@@ -107,6 +167,256 @@ def parse_status(homework):
     )
 
 
+def select_changed(homeworks, sent_messages):
+    """Отбирает работы, статус которых изменился с прошлого уведомления.
+
+    Один запрос к API возвращает статусы сразу всех обновившихся работ,
+    поэтому каждая из них разбирается отдельно. Работы, по которым
+    сообщение с тем же статусом уже отправлено, пропускаются. Ошибка
+    разбора одной работы не мешает остальным: она возвращается
+    вместе со списком изменившихся работ.
+    """
+    changed = []
+    errors = []
+    for homework in reversed(homeworks):
+        try:
+            message = parse_status(homework)
+        except (KeyError, TypeError, ValueError) as error:
+            errors.append(error)
+            continue
+        name = homework["homework_name"]
+        if sent_messages.get(name) != message:
+            sent_messages[name] = message
+            changed.append(homework)
+    return changed, errors
+
+
+def parse_statuses(homeworks, sent_messages):
+    """Формирует сообщения по всем изменившимся работам из ответа API."""
+    changed, _ = select_changed(homeworks, sent_messages)
+    return [parse_status(homework) for homework in changed]
+
+
+def make_digest(statuses):
+    """Собирает изменения статусов в одно сообщение по вердиктам.
+
+    Дайджест не длиннее MESSAGE_LIMIT символов, лимита Telegram:
+    работы, которые в него не поместились, заменяются строкой
+    с их количеством.
+    """
+    if len(statuses) == 1:
+        [(name, status)] = statuses.items()
+        return parse_status(dict(homework_name=name, status=status))
+    lines = [DIGEST_HEADER.format(count=len(statuses))]
+    for verdict_status, verdict in HOMEWORK_VERDICTES.items():
+        names = [
+            name for name, status in statuses.items()
+            if status == verdict_status
+        ]
+        if names:
+            lines.append(verdict)
+            lines.extend(
+                DIGEST_HOMEWORK.format(homework=name) for name in names
+            )
+    size = len("\n".join(lines))
+    hidden = 0
+    more = ""
+    while size + len(more) > MESSAGE_LIMIT:
+        line = lines.pop()
+        size -= len(line) + 1
+        if line not in HOMEWORK_VERDICTES.values():
+            hidden += 1
+            more = "\n" + DIGEST_MORE.format(count=hidden)
+    if lines[-1] in HOMEWORK_VERDICTES.values():
+        lines.pop()
+    return "\n".join(lines) + more
+
+
+def status_priority(status):
+    """Возвращает класс приоритета уведомления о статусе работы."""
+    if status == "reviewing":
+        return PRIORITY_REVIEWING
+    return PRIORITY_VERDICT
+
+
+def enqueue(state, priority, message):
+    """Ставит сообщение в очередь отправки с учётом старения.
+
+    Ключ очереди - время постановки, сдвинутое на PRIORITY_AGING секунд
+    за каждый класс приоритета. Срочные сообщения обгоняют менее
+    срочные, но не более чем на это время, поэтому низкие приоритеты
+    не голодают. Сдвиг кратен RETRY_TIME: очередь копится за несколько
+    итераций опроса, и смена вердикта должна обгонять сообщения,
+    поставленные несколько итераций назад.
+    """
+    heapq.heappush(
+        state["queue"], [CLOCK.time() + priority * PRIORITY_AGING, message]
+    )
+
+
+def flush_queue(bot, state):
+    """Отправляет сообщения из очереди в порядке приоритета.
+
+    Если Telegram временно не принял сообщение, оно остаётся
+    в очереди, и отправка откладывается до следующей итерации.
+    DRAIN_DEADLINE проверяется перед каждой отправкой, поэтому сигнал
+    останавливает и уже начатую отправку: после срока
+    по CLOCK.monotonic() остаток очереди сохраняется вместе
+    с состоянием.
+    """
+    queue = state["queue"]
+    while queue:
+        if (
+            DRAIN_DEADLINE is not None
+            and CLOCK.monotonic() >= DRAIN_DEADLINE
+        ):
+            return
+        entry = heapq.heappop(queue)
+        if not send_message(bot, entry[1]):
+            heapq.heappush(queue, entry)
+            return
+
+
+def notify(state, changed):
+    """Ставит уведомления в очередь сразу или копит их в дайджест.
+
+    При DIGEST_TIME > 0 изменения статусов накапливаются в состоянии
+    до отправки дайджеста функцией flush_digest.
+    """
+    if not DIGEST_TIME:
+        for homework in changed:
+            enqueue(
+                state,
+                status_priority(homework["status"]),
+                parse_status(homework),
+            )
+        return
+    for homework in changed:
+        state["digest"][homework["homework_name"]] = homework["status"]
+    if state["digest"] and state["digest_started"] is None:
+        state["digest_started"] = CLOCK.time()
+
+
+def flush_digest(state):
+    """Ставит дайджест в очередь, если его окно DIGEST_TIME истекло."""
+    if (
+        state["digest"]
+        and CLOCK.time() - state["digest_started"] >= DIGEST_TIME
+    ):
+        enqueue(
+            state,
+            min(map(status_priority, state["digest"].values())),
+            make_digest(state["digest"]),
+        )
+        state["digest"] = {}
+        state["digest_started"] = None
+
+
+def initial_state():
+    """Возвращает состояние опроса для первого запуска."""
+    return dict(
+        current_date=0,
+        sent_messages={},
+        saved_error=None,
+        digest={},
+        digest_started=None,
+        queue=[],
+    )
+
+
+def lock_state():
+    """Захватывает STATE_FILE на время работы процесса.
+
+    Новый процесс ждёт, пока предыдущий сохранит состояние и отпустит
+    блокировку, и только потом читает STATE_FILE. Возвращает файл
+    блокировки, закрытие которого её снимает. Без fcntl блокировка
+    не ставится, и предыдущий процесс нужно останавливать заранее.
+    """
+    lock = open(STATE_FILE + ".lock", "w")
+    if fcntl is None:
+        return lock
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        logging.info(STATE_LOCKED.format(path=STATE_FILE))
+        fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def load_state():
+    """Загружает состояние опроса, сохранённое предыдущим процессом."""
+    state = initial_state()
+    try:
+        with open(STATE_FILE, encoding="utf-8") as file:
+            state.update(json.load(file))
+    except FileNotFoundError:
+        return state
+    except (OSError, ValueError):
+        logging.warning(STATE_LOAD_ERROR.format(path=STATE_FILE))
+        return state
+    logging.info(STATE_RESUMED.format(current_date=state["current_date"]))
+    return state
+
+
+def save_state(state):
+    """Атомарно сохраняет состояние опроса для следующего процесса."""
+    temp_file = f"{STATE_FILE}.{os.getpid()}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as file:
+        json.dump(state, file, ensure_ascii=False)
+    os.replace(temp_file, STATE_FILE)
+
+
+def stop(signum, frame):
+    """Останавливает опрос после завершения текущей итерации.
+
+    Отправка очереди после сигнала ограничена DRAIN_TIME секундами,
+    чтобы состояние успело сохраниться до принудительного завершения.
+    Обработчик только запоминает сигнал и выставляет события, а в лог
+    сигнал пишет main() после выхода из цикла.
+    """
+    global DRAIN_DEADLINE, STOP_SIGNAL
+    DRAIN_DEADLINE = CLOCK.monotonic() + DRAIN_TIME
+    STOP_SIGNAL = signum
+    STOPPING.set()
+    WAKEUP.set()
+
+
+def report_error(state, error):
+    """Логирует ошибку и ставит её в очередь, если она новая."""
+    message = str(error)
+    logging.error(ERROR_MESSAGE.format(error=message))
+    if message != state["saved_error"]:
+        enqueue(state, PRIORITY_ERROR, message)
+        state["saved_error"] = message
+
+
+def poll(bot, state):
+    """Выполняет одну итерацию опроса API и отправки уведомлений.
+
+    Смена вердикта отправляется раньше уведомлений о взятии на ревью,
+    а те - раньше сообщений об ошибках. На первом опросе (from_date = 0)
+    API отдаёт всю историю работ: она запоминается в sent_messages,
+    но уведомление отправляется только о последней работе.
+    """
+    try:
+        response = get_api_answer(state["current_date"])
+        homeworks = check_response(response)
+        changed, errors = select_changed(homeworks, state["sent_messages"])
+        if not state["current_date"]:
+            changed = changed[-1:]
+        notify(state, changed)
+        state["current_date"] = response.get(
+            "current_date", state["current_date"]
+        )
+        state["saved_error"] = None
+        for error in errors:
+            report_error(state, error)
+    except Exception as error:
+        report_error(state, error)
+    flush_digest(state)
+    flush_queue(bot, state)
+
+
 def check_tokens():
     """Проверяет доступность необходимых переменных окружения."""
     tokens_is_exist = True
@@ -118,32 +428,46 @@ def check_tokens():
 
 
 def main():
-    """Основная логика работы бота."""
+    """Основная логика работы бота.
+
+    По SIGTERM или SIGINT текущая итерация опроса и отправки
+    доводится до конца, состояние сохраняется в STATE_FILE, и новый
+    процесс продолжает опрос с того же from_date. Новый процесс можно
+    запускать до остановки старого: он читает состояние только после
+    того, как старый отпустит блокировку lock_state. SIGUSR1 включает
+    и выключает профилирование. При заданном ADMIN_PORT после каждой
+    итерации публикуется снимок состояния для админ-API, а его
+    команда /poll прерывает ожидание до следующего опроса.
+    """
     if not check_tokens():
         raise ValueError(NO_ANY_TOKEN)
     bot = Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = 0
-    saved_message = None
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            if not homeworks:
-                continue
-            message = parse_status(homeworks[0])
-            if message != saved_message:
-                send_message(bot, message)
-                saved_message = message
-                current_timestamp = response.get(
-                    "current_date", current_timestamp
-                )
-        except Exception as error:
-            logging.error(ERROR_MESSAGE.format(error=error))
-            if str(error) == saved_message:
-                continue
-            send_message(bot, str(error))
-        finally:
-            time.sleep(RETRY_TIME)
+    state_lock = lock_state()
+    state = load_state()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, "SIGUSR1"):
+        start_worker()
+        signal.signal(signal.SIGUSR1, request_toggle)
+    admin_server = admin.start(WAKEUP)
+    while not STOPPING.is_set():
+        poll(bot, state)
+        save_state(state)
+        if admin_server is not None:
+            admin_server.snapshot = admin.make_snapshot(
+                state, CLOCK.time() + RETRY_TIME
+            )
+        CLOCK.wait(WAKEUP, RETRY_TIME)
+        WAKEUP.clear()
+    if STOP_SIGNAL is not None:
+        logging.info(
+            SHUTDOWN_REQUESTED.format(signal=signal.Signals(STOP_SIGNAL).name)
+        )
+    if admin_server is not None:
+        admin_server.shutdown()
+    logging.info(SHUTDOWN_DONE.format(current_date=state["current_date"]))
+    state_lock.close()
+    logging.shutdown()
 
 
 if __name__ == "__main__":
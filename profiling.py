@@ -0,0 +1,169 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.dirname(__file__))
+SAMPLE_INTERVAL = 0.005
+FRAME = "{function} ({file}:{line})"
+STAGE = "{stage}: вызовов {calls}, всего {total:.3f} с, максимум {max:.3f} с"
+PROFILE_STARTED = "Профилирование запущено"
+PROFILE_SAVED = "Профиль сохранён в {path}"
+PROFILE_FAILED = "Не удалось переключить профилирование"
+STAGES = defaultdict(Counter)
+STAGES_LOCK = threading.Lock()
+SAMPLER = None
+SAMPLER_LOCK = threading.Lock()
+WORKER = None
+TOGGLE_REQUESTED = threading.Event()
+
+
+@contextmanager
+def stage(name):
+    """Замеряет время этапа обработки и копит его в STAGES."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with STAGES_LOCK:
+            timings = STAGES[name]
+            timings["calls"] += 1
+            timings["total"] += elapsed
+            timings["max"] = max(timings["max"], elapsed)
+
+
+def timed(func):
+    """Оборачивает функцию в замер этапа с её именем."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def collapse(frame):
+    """Сворачивает стек кадра в строку формата flamegraph."""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            FRAME.format(
+                function=code.co_name,
+                file=os.path.basename(code.co_filename),
+                line=code.co_firstlineno,
+            )
+        )
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class Sampler:
+    """Периодически снимает стек потока в отдельном потоке."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        """Готовит сэмплирование потока thread_id раз в interval секунд."""
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        """Снимает стеки, пока сэмплирование не остановлено."""
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def start(self):
+        """Запускает сэмплирование."""
+        self.thread.start()
+
+    def stop(self):
+        """Останавливает сэмплирование и ждёт поток."""
+        self.stopped.set()
+        self.thread.join()
+
+
+def write_folded(path, stacks):
+    """Записывает счётчики стеков в файл формата collapsed stacks."""
+    with open(path, "w", encoding="utf-8") as file:
+        for stack, count in stacks.items():
+            file.write(f"{stack} {count}\n")
+
+
+def dump(stacks):
+    """Сохраняет сэмплы и замеры этапов, возвращает путь к профилю.
+
+    Рядом с профилем стеков пишется stages-файл в том же формате:
+    время этапов в микросекундах, чтобы смотреть его как flamegraph.
+    """
+    with STAGES_LOCK:
+        stages = dict(STAGES)
+        STAGES.clear()
+    suffix = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(PROFILE_DIR, f"profile-{suffix}.folded")
+    write_folded(path, stacks)
+    write_folded(
+        os.path.join(PROFILE_DIR, f"stages-{suffix}.folded"),
+        {
+            f"stages;{name}": round(timings["total"] * 1000000)
+            for name, timings in stages.items()
+        },
+    )
+    for name, timings in stages.items():
+        logging.info(STAGE.format(stage=name, **timings))
+    logging.info(PROFILE_SAVED.format(path=path))
+    return path
+
+
+def toggle():
+    """Включает сэмплирование основного потока или сохраняет профиль.
+
+    Первый вызов запускает профилировщик, второй останавливает его
+    и сохраняет результаты в PROFILE_DIR. Вызывается и из потоков
+    админ-API, поэтому переключения выполняются по одному.
+    """
+    global SAMPLER
+    with SAMPLER_LOCK:
+        if SAMPLER is None:
+            SAMPLER = Sampler(threading.main_thread().ident)
+            SAMPLER.start()
+            logging.info(PROFILE_STARTED)
+            return None
+        sampler, SAMPLER = SAMPLER, None
+        sampler.stop()
+        return dump(sampler.stacks)
+
+
+def request_toggle(signum=None, frame=None):
+    """Просит фоновый поток переключить профилирование.
+
+    Подходит как обработчик сигнала: только выставляет флаг, а поток
+    сэмплера останавливается и профиль пишется вне обработчика.
+    """
+    TOGGLE_REQUESTED.set()
+
+
+def toggle_worker():
+    """Переключает профилирование по запросам request_toggle."""
+    while True:
+        TOGGLE_REQUESTED.wait()
+        TOGGLE_REQUESTED.clear()
+        try:
+            toggle()
+        except Exception:
+            logging.exception(PROFILE_FAILED)
+
+
+def start_worker():
+    """Запускает фоновый поток переключения профилирования один раз."""
+    global WORKER
+    if WORKER is None:
+        WORKER = threading.Thread(target=toggle_worker, daemon=True)
+        WORKER.start()
@@ -0,0 +1,330 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+from hashlib import sha256
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+from urllib.parse import urlsplit
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPSTREAM = os.getenv(
+    "PROXY_UPSTREAM",
+    "https://practicum.yandex.ru/api/user_api/homework_statuses/",
+)
+PROXY_HOST = os.getenv("PROXY_HOST", "127.0.0.1")
+PROXY_PORT = int(os.getenv("PROXY_PORT", 8080))
+CACHE_TTL = float(os.getenv("PROXY_CACHE_TTL", 30))
+STALE_TTL = float(os.getenv("PROXY_STALE_TTL", 300))
+ERROR_TTL = float(os.getenv("PROXY_ERROR_TTL", 60))
+UPSTREAM_INTERVAL = float(os.getenv("PROXY_UPSTREAM_INTERVAL", 1))
+UPSTREAM_TIMEOUT = float(os.getenv("PROXY_UPSTREAM_TIMEOUT", 30))
+TOKEN_RATE = float(os.getenv("PROXY_TOKEN_RATE", 0.1))
+TOKEN_BURST = float(os.getenv("PROXY_TOKEN_BURST", 10))
+USAGE_PATH = "/_usage"
+DENIED_STATUSES = [HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN]
+DENIED_KEYS = ["code", "error"]
+CONTENT_TYPE = "application/json"
+UPSTREAM_ERROR = "Сбой запроса к {url}: {error}"
+REVALIDATE_ERROR = "Не удалось обновить кэш для {url}"
+PROXY_STARTED = "Прокси запущен на {host}:{port}, upstream: {url}"
+PROXY_REQUEST = "{address} {request}"
+THROTTLED = "Исчерпан бюджет запросов токена"
+THROTTLED_RESPONSE = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    json.dumps({"error": THROTTLED}, ensure_ascii=False).encode(),
+)
+
+
+def is_denied(response):
+    """Проверяет, что upstream отказал токену в обслуживании.
+
+    Ключи code и error проверяются только в теле ответа 200, как
+    в get_api_answer: в теле других ошибок они означают сбой upstream,
+    а не отказ токену.
+    """
+    status, body = response
+    if status in DENIED_STATUSES:
+        return True
+    if status != HTTPStatus.OK:
+        return False
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and any(key in data for key in DENIED_KEYS)
+
+
+class Flight:
+    """Запрос к upstream, результат которого ждут несколько клиентов."""
+
+    def __init__(self):
+        """Создаёт незавершённый запрос."""
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class CachingUpstream:
+    """Кэширующий клиент upstream с ограничением частоты запросов.
+
+    Ответы кэшируются по паре (Authorization, query) на ttl секунд,
+    и после этого ещё stale_ttl секунд отдаются устаревшими с фоновым
+    обновлением.
+    Отказы в обслуживании токена (401, 403 или code/error в теле 200)
+    кэшируются на error_ttl секунд, чтобы неверный токен не расходовал
+    запросы к upstream. Прочие ошибки не кэшируются и не вытесняют
+    уже сохранённый ответ. Одновременные одинаковые запросы
+    схлопываются в один.
+
+    Обращения к upstream идут не чаще одного раза в interval секунд.
+    Очередь к upstream обходится по кругу между токенами, а каждый
+    токен тратит свой бюджет: token_burst запросов с пополнением
+    token_rate запросов в секунду. Так один токен не вытесняет
+    остальные.
+    """
+
+    def __init__(
+        self,
+        url=UPSTREAM,
+        ttl=CACHE_TTL,
+        stale_ttl=STALE_TTL,
+        error_ttl=ERROR_TTL,
+        interval=UPSTREAM_INTERVAL,
+        token_rate=TOKEN_RATE,
+        token_burst=TOKEN_BURST,
+        timeout=UPSTREAM_TIMEOUT,
+        clock=time.monotonic,
+    ):
+        """Настраивает upstream, время жизни кэша и бюджеты запросов."""
+        self.url = url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.interval = interval
+        self.token_rate = token_rate
+        self.token_burst = token_burst
+        self.timeout = timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.turns = threading.Condition()
+        self.cache = {}
+        self.flights = {}
+        self.budgets = {}
+        self.waiting = OrderedDict()
+        self.usage = defaultdict(Counter)
+        self.next_call = 0
+
+    def get(self, authorization, query):
+        """Возвращает (код, тело) ответа из кэша или от upstream."""
+        key = (authorization, query)
+        with self.lock:
+            usage = self.usage[authorization]
+            usage["requests"] += 1
+            entry = self.cache.get(key)
+            now = self.clock()
+            if entry is not None and now < entry[0]:
+                usage["hits"] += 1
+                return entry[2]
+            if entry is not None and now < entry[1]:
+                usage["stale"] += 1
+                if key not in self.flights and self.take_budget(
+                    authorization, now
+                ):
+                    self.flights[key] = Flight()
+                    threading.Thread(
+                        target=self.revalidate, args=(key,), daemon=True
+                    ).start()
+                return entry[2]
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                if not self.take_budget(authorization, now):
+                    usage["throttled"] += 1
+                    return THROTTLED_RESPONSE
+                flight = self.flights[key] = Flight()
+            else:
+                usage["collapsed"] += 1
+        if leader:
+            self.fetch(key, flight)
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.response
+
+    def take_budget(self, authorization, now):
+        """Списывает запрос из бюджета токена, если он не исчерпан."""
+        tokens, updated = self.budgets.get(
+            authorization, (self.token_burst, now)
+        )
+        tokens = min(
+            self.token_burst, tokens + (now - updated) * self.token_rate
+        )
+        allowed = tokens >= 1
+        self.budgets[authorization] = (tokens - allowed, now)
+        return allowed
+
+    def revalidate(self, key):
+        """Обновляет устаревшую запись кэша в фоне."""
+        try:
+            self.fetch(key, self.flights[key])
+        except Exception:
+            logging.warning(REVALIDATE_ERROR.format(url=self.url))
+
+    def fetch(self, key, flight):
+        """Выполняет запрос к upstream и сохраняет ответ в кэш."""
+        authorization, query = key
+        try:
+            self.wait_turn(authorization)
+            response = requests.get(
+                self.url,
+                headers={"Authorization": authorization},
+                params=query,
+                timeout=self.timeout,
+            )
+            flight.response = (response.status_code, response.content)
+        except requests.exceptions.RequestException as error:
+            flight.error = ConnectionError(
+                UPSTREAM_ERROR.format(url=self.url, error=error)
+            )
+        with self.lock:
+            now = self.clock()
+            denied = flight.response is not None and is_denied(
+                flight.response
+            )
+            if denied:
+                self.usage[authorization]["errors"] += 1
+                self.cache[key] = (
+                    now + self.error_ttl, now + self.error_ttl, flight.response
+                )
+            elif flight.response and flight.response[0] == HTTPStatus.OK:
+                self.cache[key] = (
+                    now + self.ttl,
+                    now + self.ttl + self.stale_ttl,
+                    flight.response,
+                )
+            elif flight.response:
+                self.usage[authorization]["errors"] += 1
+            del self.flights[key]
+        flight.done.set()
+        if flight.error is not None:
+            raise flight.error
+
+    def wait_turn(self, authorization):
+        """Ждёт очереди токена на запрос к upstream.
+
+        Ожидающие запросы сгруппированы по токенам, и право на запрос
+        переходит по кругу от токена к токену не чаще раза в interval.
+        """
+        ticket = object()
+        with self.turns:
+            self.waiting.setdefault(authorization, deque()).append(ticket)
+            while True:
+                head = next(iter(self.waiting.values()))
+                now = self.clock()
+                if head[0] is ticket and now >= self.next_call:
+                    break
+                self.turns.wait(
+                    self.next_call - now if head[0] is ticket else None
+                )
+            tickets = self.waiting.pop(authorization)
+            tickets.popleft()
+            if tickets:
+                self.waiting[authorization] = tickets
+            self.next_call = max(now, self.next_call) + self.interval
+            self.turns.notify_all()
+        with self.lock:
+            self.usage[authorization]["upstream"] += 1
+
+    def report(self):
+        """Возвращает учёт запросов по токенам без самих токенов."""
+        with self.lock:
+            return {
+                sha256(str(authorization).encode()).hexdigest()[:12]: dict(
+                    usage,
+                    budget=self.budgets.get(
+                        authorization, (self.token_burst,)
+                    )[0],
+                )
+                for authorization, usage in self.usage.items()
+            }
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """Отдаёт ответы upstream через CachingUpstream сервера."""
+
+    def do_GET(self):
+        """Проксирует GET-запрос с исходными Authorization и query."""
+        url = urlsplit(self.path)
+        if url.path == USAGE_PATH:
+            report = self.server.upstream.report()
+            return self.respond(HTTPStatus.OK, json.dumps(report).encode())
+        try:
+            status, body = self.server.upstream.get(
+                self.headers.get("Authorization"), url.query
+            )
+        except ConnectionError as error:
+            status, body = HTTPStatus.BAD_GATEWAY, str(error).encode()
+        self.respond(status, body)
+
+    def respond(self, status, body):
+        """Отправляет клиенту JSON-ответ."""
+        self.send_response(status)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Пишет строку доступа в общий лог вместо stderr."""
+        logging.info(
+            PROXY_REQUEST.format(
+                address=self.address_string(), request=format % args
+            )
+        )
+
+
+def make_server(host=PROXY_HOST, port=PROXY_PORT, upstream=None):
+    """Создаёт HTTP-сервер кэширующего прокси."""
+    server = ThreadingHTTPServer((host, port), ProxyHandler)
+    server.daemon_threads = True
+    server.upstream = upstream or CachingUpstream()
+    return server
+
+
+def main():
+    """Запускает кэширующий прокси перед API Практикума."""
+    server = make_server()
+    logging.info(
+        PROXY_STARTED.format(
+            host=PROXY_HOST, port=server.server_port, url=UPSTREAM
+        )
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+
+    logging.basicConfig(
+        level=logging.INFO,
+        handlers=[
+            RotatingFileHandler(
+                __file__ + ".log", maxBytes=5000000, backupCount=5
+            ),
+            logging.StreamHandler(),
+        ],
+        format=(
+            "[%(asctime)s][%(levelname)s][str: %(lineno)d]"
+            "[func: %(funcName)s] > %(message)s"
+        ),
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    main()
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+import requests
+
+import admin
+import homework
+
+
+@pytest.fixture
+def server():
+    wakeup = threading.Event()
+    server = admin.make_server(wakeup, host='127.0.0.1', port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    state = homework.initial_state()
+    state['current_date'] = 100
+    state['sent_messages'] = {f'hw{index}': 'message' for index in range(5)}
+    state['queue'] = [[20, 'later'], [10, 'sooner']]
+    server.state = state
+    server.snapshot = admin.make_snapshot(state, 400)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestAdmin:
+
+    def test_state(self, server):
+        data = requests.get(server.url + '/state').json()
+        assert data['current_date'] == 100
+        assert data['next_poll'] == 400
+        assert 'homeworks' not in data
+
+    def test_homeworks_paginated(self, server):
+        data = requests.get(
+            server.url + '/homeworks', params={'offset': 1, 'limit': 2}
+        ).json()
+        assert data['total'] == 5
+        assert [item['homework'] for item in data['items']] == ['hw1', 'hw2']
+        response = requests.get(server.url + '/homeworks?limit=x')
+        assert response.status_code == 400
+
+    def test_queue_in_send_order(self, server):
+        data = requests.get(server.url + '/queue').json()
+        assert [item['message'] for item in data['items']] == [
+            'sooner', 'later'
+        ]
+
+    def test_snapshot_is_independent(self, server):
+        server.state['sent_messages']['hw9'] = 'message'
+        server.state['queue'].clear()
+        data = requests.get(server.url + '/homeworks').json()
+        assert data['total'] == 5
+        assert requests.get(server.url + '/queue').json()['total'] == 2
+
+    def test_forced_poll(self, server):
+        response = requests.post(server.url + '/poll')
+        assert response.status_code == 202
+        assert server.wakeup.is_set()
+
+    def test_unknown_path(self, server):
+        assert requests.get(server.url + '/tokens').status_code == 404
+        assert requests.post(server.url + '/state').status_code == 404
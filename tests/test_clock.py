@@ -0,0 +1,40 @@
+import threading
+
+from clock import VirtualClock
+
+
+class TestVirtualClock:
+
+    def test_timers_run_in_order(self):
+        clock = VirtualClock()
+        calls = []
+        clock.call_later(20, lambda: calls.append(('b', clock.time())))
+        clock.call_at(10, lambda: calls.append(('a', clock.time())))
+        clock.sleep(15)
+        assert calls == [('a', 10)]
+        assert clock.time() == 15
+        clock.run_until(100)
+        assert calls == [('a', 10), ('b', 20)]
+        assert clock.time() == 100
+
+    def test_timer_reschedules_itself(self):
+        clock = VirtualClock()
+        ticks = []
+
+        def tick():
+            ticks.append(clock.time())
+            clock.call_later(300, tick)
+
+        clock.call_later(300, tick)
+        clock.run_until(7 * 24 * 3600)
+        assert len(ticks) == 7 * 24 * 12
+        assert ticks[-1] == 7 * 24 * 3600
+
+    def test_wait_returns_when_event_set(self):
+        clock = VirtualClock()
+        event = threading.Event()
+        clock.call_later(50, event.set)
+        assert clock.wait(event, 300)
+        assert clock.time() == 50
+        assert clock.wait(event, 300)
+        assert clock.time() == 50
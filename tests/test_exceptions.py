@@ -0,0 +1,43 @@
+import pytest
+import requests
+
+import homework
+from exceptions import NetworkError, StatusCodeError
+
+SECRET = 'OAuth secret-token'
+
+
+class MockResponse:
+    status_code = 500
+
+
+class TestRequestErrors:
+
+    def test_network_error_formats_and_redacts(self, monkeypatch):
+        def mock_get(*args, **kwargs):
+            raise requests.exceptions.ConnectionError('refused')
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        monkeypatch.setattr(homework, 'HEADERS', {'Authorization': SECRET})
+        with pytest.raises(ConnectionError) as error:
+            homework.get_api_answer(0)
+        assert isinstance(error.value, NetworkError)
+        message = str(error.value)
+        assert 'refused' in message
+        assert 'secret-token' not in message
+
+    def test_status_code_error_redacts(self, monkeypatch):
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse()
+        )
+        monkeypatch.setattr(homework, 'HEADERS', {'Authorization': SECRET})
+        with pytest.raises(StatusCodeError) as error:
+            homework.get_api_answer(0)
+        assert '500' in str(error.value)
+        assert 'secret-token' not in str(error.value)
+        assert 'secret-token' not in repr(error.value)
+
+    def test_message_rendered_lazily(self):
+        error = StatusCodeError('{code}', code=500, headers={})
+        assert error.context == {'code': 500, 'headers': {}}
+        assert str(error) == '500'
@@ -0,0 +1,147 @@
+import signal
+import threading
+
+import pytest
+
+import homework
+from clock import VirtualClock
+
+
+class StoppingBot:
+
+    def __init__(self, token=None):
+        self.messages = []
+
+    def send_message(self, chat_id, text):
+        self.messages.append(text)
+        homework.stop(signal.SIGTERM, None)
+
+
+@pytest.fixture
+def state_file(monkeypatch, tmp_path):
+    path = str(tmp_path / 'homework.state')
+    monkeypatch.setattr(homework, 'STATE_FILE', path)
+    monkeypatch.setattr(homework, 'DRAIN_DEADLINE', None)
+    monkeypatch.setattr(homework, 'STOP_SIGNAL', None)
+    yield path
+    homework.STOPPING.clear()
+    homework.WAKEUP.clear()
+
+
+class TestLifecycle:
+
+    def test_state_roundtrip(self, state_file):
+        assert homework.load_state()['current_date'] == 0
+        state = homework.load_state()
+        state['current_date'] = 123
+        state['sent_messages']['hw1'] = 'message'
+        homework.save_state(state)
+        assert homework.load_state() == state
+
+    def test_broken_state_ignored(self, state_file):
+        with open(state_file, 'w') as file:
+            file.write('{')
+        assert homework.load_state()['current_date'] == 0
+
+    def test_successor_waits_for_state_lock(self, state_file):
+        previous = homework.lock_state()
+        resumed = []
+
+        def successor():
+            with homework.lock_state():
+                resumed.append(homework.load_state()['current_date'])
+
+        thread = threading.Thread(target=successor)
+        thread.start()
+        thread.join(0.2)
+        assert not resumed
+        state = homework.initial_state()
+        state['current_date'] = 123
+        homework.save_state(state)
+        previous.close()
+        thread.join(5)
+        assert resumed == [123]
+
+    def test_stop_signal(self, monkeypatch, state_file):
+        logged = []
+        monkeypatch.setattr(
+            homework.logging, 'info', lambda *args: logged.append(args)
+        )
+        homework.stop(signal.SIGTERM, None)
+        assert homework.STOPPING.is_set()
+        assert homework.STOP_SIGNAL == signal.SIGTERM
+        assert not logged
+
+    def test_main_drains_and_resumes(self, monkeypatch, state_file):
+        bots = []
+        timestamps = []
+
+        def make_bot(token):
+            bots.append(StoppingBot(token))
+            return bots[-1]
+
+        def get_api_answer(current_timestamp):
+            timestamps.append(current_timestamp)
+            return {
+                'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+                'current_date': 100,
+            }
+
+        monkeypatch.setattr(homework, 'check_tokens', lambda: True)
+        monkeypatch.setattr(homework, 'Bot', make_bot)
+        monkeypatch.setattr(homework, 'get_api_answer', get_api_answer)
+        monkeypatch.setattr(homework.signal, 'signal', lambda *args: None)
+        monkeypatch.setattr(homework.logging, 'shutdown', lambda: None)
+        homework.main()
+        assert len(bots[0].messages) == 1
+        homework.STOPPING.clear()
+        clock = VirtualClock()
+        clock.call_later(homework.RETRY_TIME, homework.STOPPING.set)
+        monkeypatch.setattr(homework, 'CLOCK', clock)
+        homework.main()
+        assert timestamps == [0, 100]
+        assert not bots[1].messages
+
+    def test_drain_bounded_by_deadline(self, monkeypatch, state_file):
+        clock = VirtualClock()
+        sent = []
+
+        def send_message(bot, message):
+            clock.sleep(10)
+            sent.append(message)
+            return True
+
+        monkeypatch.setattr(homework, 'CLOCK', clock)
+        monkeypatch.setattr(homework, 'send_message', send_message)
+        monkeypatch.setattr(
+            homework, 'get_api_answer', lambda current_timestamp: {}
+        )
+        state = homework.initial_state()
+        for index in range(5):
+            homework.enqueue(state, homework.PRIORITY_VERDICT, str(index))
+        homework.stop(signal.SIGTERM, None)
+        homework.poll(None, state)
+        assert len(sent) == 2
+        assert len(state['queue']) == 4
+        homework.save_state(state)
+        assert len(homework.load_state()['queue']) == 4
+
+    def test_signal_during_flush_bounds_drain(self, monkeypatch, state_file):
+        clock = VirtualClock()
+        sent = []
+
+        def send_message(bot, message):
+            if not sent:
+                homework.stop(signal.SIGTERM, None)
+            clock.sleep(10)
+            sent.append(message)
+            return True
+
+        monkeypatch.setattr(homework, 'CLOCK', clock)
+        monkeypatch.setattr(homework, 'send_message', send_message)
+        state = {'queue': []}
+        for index in range(20):
+            homework.enqueue(state, homework.PRIORITY_VERDICT, str(index))
+        homework.flush_queue(None, state)
+        assert len(sent) == 2
+        assert len(state['queue']) == 18
@@ -0,0 +1,214 @@
+from telegram.error import BadRequest
+
+import homework
+from clock import VirtualClock
+
+
+class TestParseStatuses:
+
+    def test_all_homeworks_from_one_response(self):
+        homeworks = [
+            {'homework_name': 'hw2', 'status': 'reviewing'},
+            {'homework_name': 'hw1', 'status': 'approved'},
+        ]
+        messages = homework.parse_statuses(homeworks, {})
+        assert len(messages) == 2
+        assert '"hw1"' in messages[0]
+        assert '"hw2"' in messages[1]
+
+    def test_sent_messages_not_repeated(self):
+        homeworks = [{'homework_name': 'hw1', 'status': 'approved'}]
+        sent_messages = {}
+        assert homework.parse_statuses(homeworks, sent_messages)
+        assert not homework.parse_statuses(homeworks, sent_messages)
+        homeworks[0]['status'] = 'rejected'
+        assert homework.parse_statuses(homeworks, sent_messages)
+
+
+class TestDigest:
+
+    def test_digest_grouped_by_verdict(self):
+        digest = homework.make_digest(
+            {'hw1': 'rejected', 'hw2': 'approved', 'hw3': 'rejected'}
+        )
+        lines = digest.split('\n')
+        assert lines[0].endswith('3')
+        assert lines[1] == homework.HOMEWORK_VERDICTES['approved']
+        assert lines[3] == homework.HOMEWORK_VERDICTES['rejected']
+        assert lines[4:] == ['- hw1', '- hw3']
+
+    def test_long_digest_truncated(self):
+        statuses = {f'homework_{index:04}': 'approved' for index in range(500)}
+        digest = homework.make_digest(statuses)
+        lines = digest.split('\n')
+        assert len(digest) <= homework.MESSAGE_LIMIT
+        assert lines[-1].startswith('...')
+        hidden = int(lines[-1].rsplit(' ', 1)[1])
+        assert hidden + len(lines) - 3 == 500
+
+    def test_single_change_sent_as_status(self):
+        digest = homework.make_digest({'hw1': 'approved'})
+        assert digest == homework.parse_status(
+            {'homework_name': 'hw1', 'status': 'approved'}
+        )
+
+    def test_notify_buffers_until_window(self, monkeypatch):
+        clock = VirtualClock(1000)
+        monkeypatch.setattr(homework, 'DIGEST_TIME', 60)
+        monkeypatch.setattr(homework, 'CLOCK', clock)
+        state = {'digest': {}, 'digest_started': None, 'queue': []}
+        homework.notify(state, [
+            {'homework_name': 'hw1', 'status': 'reviewing'},
+            {'homework_name': 'hw2', 'status': 'reviewing'},
+        ])
+        clock.sleep(30)
+        homework.notify(state, [
+            {'homework_name': 'hw1', 'status': 'approved'},
+        ])
+        homework.flush_digest(state)
+        assert not state['queue']
+        clock.sleep(30)
+        homework.flush_digest(state)
+        assert len(state['queue']) == 1
+        assert state['digest'] == {}
+        assert state['digest_started'] is None
+
+    def test_digest_flushed_while_polling_fails(self, monkeypatch):
+        clock = VirtualClock(1000)
+        sent = []
+
+        def get_api_answer(current_timestamp):
+            raise ConnectionError('offline')
+
+        monkeypatch.setattr(homework, 'DIGEST_TIME', 60)
+        monkeypatch.setattr(homework, 'CLOCK', clock)
+        monkeypatch.setattr(homework, 'get_api_answer', get_api_answer)
+        monkeypatch.setattr(
+            homework,
+            'send_message',
+            lambda bot, message: sent.append(message) or True,
+        )
+        state = homework.initial_state()
+        homework.notify(state, [
+            {'homework_name': 'hw1', 'status': 'approved'},
+        ])
+        clock.sleep(60)
+        homework.poll(None, state)
+        assert sent[0] == homework.parse_status(
+            {'homework_name': 'hw1', 'status': 'approved'}
+        )
+        assert sent[1] == 'offline'
+        assert state['digest'] == {}
+
+
+class TestPriorityQueue:
+
+    def flush(self, monkeypatch, state, fail_after=None):
+        sent = []
+
+        def send_message(bot, message):
+            if fail_after is not None and len(sent) >= fail_after:
+                return False
+            sent.append(message)
+            return True
+
+        monkeypatch.setattr(homework, 'send_message', send_message)
+        homework.flush_queue(None, state)
+        return sent
+
+    def test_urgent_messages_first(self, monkeypatch):
+        monkeypatch.setattr(homework, 'CLOCK', VirtualClock(1000))
+        state = {'queue': []}
+        homework.enqueue(state, homework.PRIORITY_ERROR, 'error')
+        homework.enqueue(state, homework.PRIORITY_REVIEWING, 'reviewing')
+        homework.enqueue(state, homework.PRIORITY_VERDICT, 'rejected')
+        assert self.flush(monkeypatch, state) == [
+            'rejected', 'reviewing', 'error'
+        ]
+
+    def test_aging_prevents_starvation(self, monkeypatch):
+        clock = VirtualClock(1000)
+        monkeypatch.setattr(homework, 'CLOCK', clock)
+        state = {'queue': []}
+        homework.enqueue(state, homework.PRIORITY_ERROR, 'error')
+        clock.sleep(2 * homework.PRIORITY_AGING + 1)
+        homework.enqueue(state, homework.PRIORITY_VERDICT, 'rejected')
+        assert self.flush(monkeypatch, state) == ['error', 'rejected']
+
+    def test_failed_send_stays_queued(self, monkeypatch):
+        state = {'queue': []}
+        homework.enqueue(state, homework.PRIORITY_VERDICT, 'first')
+        homework.enqueue(state, homework.PRIORITY_ERROR, 'second')
+        assert self.flush(monkeypatch, state, fail_after=1) == ['first']
+        assert [entry[1] for entry in state['queue']] == ['second']
+
+    def test_rejected_message_does_not_block_queue(self, monkeypatch):
+        sent = []
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                if len(text) > homework.MESSAGE_LIMIT:
+                    raise BadRequest('Message is too long')
+                sent.append(text)
+
+        state = {'queue': []}
+        homework.enqueue(state, homework.PRIORITY_VERDICT, 'x' * 5000)
+        homework.enqueue(state, homework.PRIORITY_ERROR, 'error')
+        homework.flush_queue(Bot(), state)
+        assert sent == ['error']
+        assert not state['queue']
+
+
+class TestMixedBatch:
+
+    def test_invalid_homework_does_not_block_others(self, monkeypatch):
+        response = {
+            'homeworks': [
+                {'homework_name': 'hw1', 'status': 'approved'},
+                {'homework_name': 'bad', 'status': 'weird'},
+            ],
+            'current_date': 100,
+        }
+        monkeypatch.setattr(homework, 'DIGEST_TIME', 0)
+        monkeypatch.setattr(
+            homework, 'get_api_answer', lambda current_timestamp: response
+        )
+        sent = []
+        monkeypatch.setattr(
+            homework,
+            'send_message',
+            lambda bot, message: sent.append(message) or True,
+        )
+        state = homework.initial_state()
+        homework.poll(None, state)
+        assert any('"hw1"' in message for message in sent)
+        assert any('weird' in message for message in sent)
+        assert state['current_date'] == 100
+        assert 'bad' not in state['sent_messages']
+
+    def test_first_poll_sends_only_newest(self, monkeypatch):
+        response = {
+            'homeworks': [
+                {'homework_name': 'hw3', 'status': 'reviewing'},
+                {'homework_name': 'hw2', 'status': 'approved'},
+                {'homework_name': 'hw1', 'status': 'rejected'},
+            ],
+            'current_date': 100,
+        }
+        monkeypatch.setattr(homework, 'DIGEST_TIME', 0)
+        monkeypatch.setattr(
+            homework, 'get_api_answer', lambda current_timestamp: response
+        )
+        sent = []
+        monkeypatch.setattr(
+            homework,
+            'send_message',
+            lambda bot, message: sent.append(message) or True,
+        )
+        state = homework.initial_state()
+        homework.poll(None, state)
+        assert len(sent) == 1
+        assert '"hw3"' in sent[0]
+        assert set(state['sent_messages']) == {'hw1', 'hw2', 'hw3'}
+        homework.poll(None, state)
+        assert len(sent) == 1
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+import pytest
+
+import profiling
+
+
+def busy_loop(stopped):
+    while not stopped.is_set():
+        sum(range(100))
+
+
+@pytest.fixture(autouse=True)
+def stages(monkeypatch):
+    monkeypatch.setattr(profiling, 'STAGES', defaultdict(Counter))
+
+
+class TestProfiling:
+
+    def test_stage_timers(self):
+
+        @profiling.timed
+        def parse_status(homework):
+            return homework
+
+        parse_status(1)
+        with profiling.stage('response.json'):
+            pass
+        assert profiling.STAGES['parse_status']['calls'] == 1
+        assert profiling.STAGES['response.json']['calls'] == 1
+
+    def test_sampler_collects_stacks(self):
+        stopped = threading.Event()
+        thread = threading.Thread(target=busy_loop, args=(stopped,))
+        thread.start()
+        sampler = profiling.Sampler(thread.ident, interval=0.001)
+        sampler.start()
+        time.sleep(0.1)
+        sampler.stop()
+        stopped.set()
+        thread.join()
+        assert any('busy_loop' in stack for stack in sampler.stacks)
+
+    def test_toggle_dumps_folded_files(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+        with profiling.stage('send_message'):
+            pass
+        assert profiling.toggle() is None
+        time.sleep(0.05)
+        path = profiling.toggle()
+        assert os.path.exists(path)
+        [stages] = tmp_path.glob('stages-*.folded')
+        assert stages.read_text().startswith('stages;send_message ')
+        assert not profiling.STAGES
+
+    def test_signal_handler_defers_to_worker(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+        calls = []
+        monkeypatch.setattr(profiling, 'toggle', lambda: calls.append(1))
+        profiling.request_toggle()
+        assert not calls
+        profiling.start_worker()
+        for _ in range(100):
+            if calls:
+                break
+            time.sleep(0.01)
+        assert calls == [1]
+        assert not profiling.TOGGLE_REQUESTED.is_set()
+
+    def test_concurrent_toggles_do_not_leak_samplers(self, monkeypatch):
+        dumps = []
+        monkeypatch.setattr(
+            profiling, 'dump', lambda stacks: dumps.append(stacks)
+        )
+        barrier = threading.Barrier(10)
+
+        def toggle():
+            barrier.wait()
+            profiling.toggle()
+
+        threads = [threading.Thread(target=toggle) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert profiling.SAMPLER is None
+        assert len(dumps) == 5
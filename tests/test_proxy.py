@@ -0,0 +1,228 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import proxy
+
+
+class StandInUpstream(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.calls.append((self.headers['Authorization'], self.path))
+        time.sleep(self.server.delay)
+        body = self.server.body or json.dumps({
+            'homeworks': [],
+            'current_date': len(self.server.calls),
+        }).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInUpstream)
+    server.calls = []
+    server.delay = 0
+    server.status = 200
+    server.body = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_cache(upstream, **kwargs):
+    kwargs.setdefault('interval', 0)
+    return proxy.CachingUpstream(
+        url=f'http://127.0.0.1:{upstream.server_port}/', **kwargs
+    )
+
+
+class TestCachingUpstream:
+
+    def test_fresh_response_served_from_cache(self, upstream):
+        cache = make_cache(upstream, ttl=60)
+        first = cache.get('OAuth a', 'from_date=0')
+        second = cache.get('OAuth a', 'from_date=0')
+        assert first == second
+        assert len(upstream.calls) == 1
+
+    def test_cache_is_per_token(self, upstream):
+        cache = make_cache(upstream, ttl=60)
+        cache.get('OAuth a', 'from_date=0')
+        cache.get('OAuth b', 'from_date=0')
+        assert [call[0] for call in upstream.calls] == ['OAuth a', 'OAuth b']
+
+    def test_concurrent_requests_collapsed(self, upstream):
+        upstream.delay = 0.2
+        cache = make_cache(upstream, ttl=60)
+        threads = [
+            threading.Thread(target=cache.get, args=('OAuth a', 'x=1'))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(upstream.calls) == 1
+
+    def test_stale_while_revalidate(self, upstream):
+        now = [0]
+        cache = make_cache(
+            upstream, ttl=10, stale_ttl=100, clock=lambda: now[0]
+        )
+        first = cache.get('OAuth a', 'x=1')
+        now[0] = 50
+        assert cache.get('OAuth a', 'x=1') == first
+        for _ in range(50):
+            if cache.cache[('OAuth a', 'x=1')][2] != first:
+                break
+            time.sleep(0.01)
+        assert len(upstream.calls) == 2
+        assert cache.get('OAuth a', 'x=1') != first
+
+    def test_stale_window_follows_ttl(self, upstream):
+        now = [0]
+        cache = make_cache(
+            upstream, ttl=10, stale_ttl=5, clock=lambda: now[0]
+        )
+        first = cache.get('OAuth a', 'x=1')
+        now[0] = 12
+        assert cache.get('OAuth a', 'x=1') == first
+
+    def test_hung_upstream_times_out(self, upstream):
+        upstream.delay = 0.5
+        cache = make_cache(upstream, timeout=0.1)
+        with pytest.raises(ConnectionError):
+            cache.get('OAuth a', 'x=1')
+        assert not cache.flights
+
+    def test_upstream_rate_limited(self, upstream):
+        cache = make_cache(upstream, ttl=0, stale_ttl=0, interval=0.1)
+        started = time.monotonic()
+        for index in range(3):
+            cache.get('OAuth a', f'x={index}')
+        assert time.monotonic() - started >= 0.2
+
+    def test_token_budget_throttles(self, upstream):
+        cache = make_cache(
+            upstream, ttl=0, stale_ttl=0, token_rate=0, token_burst=2
+        )
+        statuses = [
+            cache.get('OAuth a', f'x={index}')[0] for index in range(3)
+        ]
+        assert statuses == [200, 200, 429]
+        assert cache.get('OAuth b', 'x=0')[0] == 200
+        assert cache.usage['OAuth a']['throttled'] == 1
+
+    def test_failing_token_cached_briefly(self, upstream):
+        upstream.status = 401
+        cache = make_cache(upstream, error_ttl=60)
+        for _ in range(3):
+            assert cache.get('OAuth bad', 'x=1')[0] == 401
+        assert len(upstream.calls) == 1
+        assert cache.usage['OAuth bad']['errors'] == 1
+
+    def test_denial_in_ok_body_cached(self, upstream):
+        upstream.body = b'{"code": "not_authenticated"}'
+        cache = make_cache(upstream, error_ttl=60)
+        for _ in range(2):
+            assert cache.get('OAuth bad', 'x=1')[1] == upstream.body
+        assert len(upstream.calls) == 1
+
+    def test_transient_error_not_cached(self, upstream):
+        upstream.status = 503
+        cache = make_cache(upstream, error_ttl=60)
+        assert cache.get('OAuth a', 'x=1')[0] == 503
+        upstream.status = 200
+        assert cache.get('OAuth a', 'x=1')[0] == 200
+        assert len(upstream.calls) == 2
+
+    def test_failed_revalidation_keeps_entry(self, upstream):
+        now = [0]
+        cache = make_cache(
+            upstream, ttl=10, stale_ttl=100, clock=lambda: now[0]
+        )
+        first = cache.get('OAuth a', 'x=1')
+        upstream.status = 503
+        now[0] = 50
+        assert cache.get('OAuth a', 'x=1') == first
+        for _ in range(50):
+            if cache.usage['OAuth a']['errors']:
+                break
+            time.sleep(0.01)
+        assert cache.usage['OAuth a']['errors'] == 1
+        assert cache.get('OAuth a', 'x=1') == first
+
+    def test_error_body_does_not_evict_entry(self, upstream):
+        now = [0]
+        cache = make_cache(
+            upstream, ttl=10, stale_ttl=100, clock=lambda: now[0]
+        )
+        first = cache.get('OAuth a', 'x=1')
+        upstream.status = 503
+        upstream.body = b'{"error": "Service Unavailable"}'
+        now[0] = 50
+        assert cache.get('OAuth a', 'x=1') == first
+        for _ in range(50):
+            if cache.usage['OAuth a']['errors']:
+                break
+            time.sleep(0.01)
+        assert cache.cache[('OAuth a', 'x=1')][2] == first
+
+    def test_tokens_served_round_robin(self, upstream):
+        cache = make_cache(upstream, ttl=0, stale_ttl=0, interval=0.05)
+        threads = [
+            threading.Thread(target=cache.get, args=('OAuth a', f'x={index}'))
+            for index in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.02)
+        threads.append(
+            threading.Thread(target=cache.get, args=('OAuth b', 'x=0'))
+        )
+        threads[-1].start()
+        for thread in threads:
+            thread.join()
+        tokens = [call[0] for call in upstream.calls]
+        assert tokens.index('OAuth b') <= 2
+
+    def test_usage_report_hides_tokens(self, upstream):
+        cache = make_cache(upstream, ttl=60)
+        cache.get('OAuth secret', 'x=1')
+        cache.get('OAuth secret', 'x=1')
+        [usage] = cache.report().values()
+        assert 'OAuth secret' not in json.dumps(cache.report())
+        assert usage['requests'] == 2
+        assert usage['hits'] == 1
+        assert usage['upstream'] == 1
+
+
+def test_get_api_answer_through_proxy(monkeypatch, upstream):
+    import homework
+
+    server = proxy.make_server(
+        host='127.0.0.1', port=0, upstream=make_cache(upstream, ttl=60)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        homework, 'ENDPOINT', f'http://127.0.0.1:{server.server_port}/'
+    )
+    try:
+        first = homework.get_api_answer(0)
+        second = homework.get_api_answer(0)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert first == second == {'homeworks': [], 'current_date': 1}
+    assert upstream.calls[0][0].startswith('OAuth ')